@@ -9,11 +9,12 @@ Usage:
 
 import argparse
 import sys
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timezone
 from pathlib import Path
 
 from src.pipeline import load_config, run_pipeline
-from src.storage import save_csv, save_json, save_sqlite
+from src.storage import peek, save_csv, save_json, save_sqlite
 
 
 def parse_players_arg(s: str) -> list[dict]:
@@ -91,14 +92,18 @@ def main() -> int:
         )
         return 1
 
-    run_id = None  # storage will use timestamp if None
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
     results = run_pipeline(
         players,
         use_batch=not args.no_batch,
         rate_limit_sec=args.rate_limit,
+        cache_path=out_dir / "id_cache.sqlite",
     )
 
-    if not results:
+    results = peek(results)
+    if results is None:
         print(
             "No stats retrieved. Check player names and platforms.",
             file=sys.stderr,
@@ -106,20 +111,36 @@ def main() -> int:
         return 1
 
     run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    out_dir = Path(args.output_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
 
     writers = (
         ("json", save_json, "JSON"),
         ("csv", save_csv, "CSV"),
         ("sqlite", save_sqlite, "SQLite"),
     )
-    for fmt, save_fn, label in writers:
-        if args.format in (fmt, "all"):
-            path = save_fn(results, out_dir, run_id=run_id)
-            print(f"Wrote {label}: {path}")
-
-    print(f"Fetched {len(results)} player(s).")
+    selected = [
+        (save_fn, label)
+        for fmt, save_fn, label in writers
+        if args.format in (fmt, "all")
+    ]
+
+    fetched = 0
+
+    def tally(stats: Iterable[dict]) -> Iterator[dict]:
+        nonlocal fetched
+        for stat in stats:
+            fetched += 1
+            yield stat
+
+    stats = tally(results)
+    if len(selected) > 1:
+        # Every writer consumes the results, so buffer them once
+        stats = list(stats)
+
+    for save_fn, label in selected:
+        path = save_fn(stats, out_dir, run_id=run_id)
+        print(f"Wrote {label}: {path}")
+
+    print(f"Fetched {fetched} player(s).")
     return 0
 
 
@@ -5,19 +5,194 @@ Base URL: https://api.gametools.network
 No API key required. Uses rate limiting and retries.
 """
 
+import random
+import sqlite3
+import threading
 import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from src import json_compat
 
 BASE_URL = "https://api.gametools.network"
 DEFAULT_RATE_LIMIT_SEC = 1.0
 MAX_RETRIES = 3
 RETRY_BACKOFF_SEC = 1.0
+RETRY_BACKOFF_CAP_SEC = 30.0
+RETRY_JITTER_SEC = 1.0
+POOL_SIZE = 10
+# Adaptive rate limit: on 429/503 the interval grows by 1/THROTTLE_BETA (up to
+# MAX_RATE_LIMIT_SEC); each success shrinks it by RECOVERY_FACTOR toward baseline.
+THROTTLE_BETA = 0.5
+RECOVERY_FACTOR = 0.9
+MIN_THROTTLED_RATE_LIMIT_SEC = 0.5
+MAX_RATE_LIMIT_SEC = 30.0
+THROTTLE_STATUS_CODES = (429, 503)
+# Player IDs are effectively permanent; re-resolve occasionally in case of renames
+ID_CACHE_TTL_SEC = 30 * 24 * 3600
 
 
 class BF6APIError(Exception):
     """Raised when the API returns an error or invalid response."""
 
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def rejected(self) -> bool:
+        """True for a 4xx other than 429: the request itself was refused."""
+        code = self.status_code
+        return code is not None and 400 <= code < 500 and code != 429
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe minimum spacing between requests.
+
+    The interval widens when the server throttles us and decays back toward
+    the configured baseline as requests succeed.
+    """
+
+    def __init__(self, interval_sec: float):
+        self.base_interval_sec = interval_sec
+        self.interval_sec = interval_sec
+        # Monotonic time of the next free request slot
+        self._next_allowed: float = 0.0
+        # Monotonic time the interval was last widened; limits widening to
+        # once per interval so a burst of concurrent 429s counts as one
+        self._last_widened: float = float("-inf")
+        self._lock = threading.Lock()
+
+    def set_base_interval(self, interval_sec: float) -> None:
+        """Change the configured baseline and reset the current interval to it."""
+        with self._lock:
+            self.base_interval_sec = interval_sec
+            self.interval_sec = interval_sec
+
+    def wait(self) -> None:
+        """
+        Block until this caller's request slot.
+
+        Slots are spaced interval_sec apart on a fixed cadence, so request
+        latency doesn't stretch the effective interval. The slot is reserved
+        under the lock and slept outside it, so threads queue in order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_allowed, now)
+            self._next_allowed = slot + self.interval_sec
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_throttle(self) -> None:
+        """
+        Back off after a 429/503 response.
+
+        Throttles within interval_sec of the last widen belong to the same
+        episode (requests already in flight) and are ignored.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_widened < self.interval_sec:
+                return
+            widened = max(self.interval_sec, MIN_THROTTLED_RATE_LIMIT_SEC)
+            self.interval_sec = min(MAX_RATE_LIMIT_SEC, widened / THROTTLE_BETA)
+            self._last_widened = now
+
+    def on_success(self) -> None:
+        """Relax toward the baseline interval after a successful response."""
+        with self._lock:
+            self.interval_sec = max(
+                self.base_interval_sec, self.interval_sec * RECOVERY_FACTOR
+            )
+
+
+class PlayerIDCache:
+    """
+    SQLite-backed (platform, name) -> player info cache, shared across runs.
+
+    Names are matched case-insensitively. Entries older than ttl_sec miss.
+    """
+
+    def __init__(self, path: str | Path, ttl_sec: float = ID_CACHE_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        # One connection shared by the client's worker threads, behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS player_ids ("
+                "platform TEXT NOT NULL, name TEXT NOT NULL, "
+                "info TEXT NOT NULL, cached_at REAL NOT NULL, "
+                "PRIMARY KEY (platform, name))"
+            )
+
+    def get(self, name: str, platform: str) -> dict | None:
+        """Return cached player info, or None on miss or expiry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info FROM player_ids "
+                "WHERE platform = ? AND name = ? AND cached_at >= ?",
+                (platform, name.lower(), time.time() - self.ttl_sec),
+            ).fetchone()
+        return json_compat.loads(row[0]) if row else None
+
+    def put(self, name: str, platform: str, info: dict) -> None:
+        """Insert or refresh the cached info for a player."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO player_ids "
+                "(platform, name, info, cached_at) VALUES (?, ?, ?, ?)",
+                (
+                    platform,
+                    name.lower(),
+                    json_compat.dumps(info).decode("utf-8"),
+                    time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _batch_result(data: dict | list) -> list[dict]:
+    """Normalize a /bf6/multiple/ response body to a list of stat dicts."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and "result" in data:
+        return data["result"]
+    return [data] if isinstance(data, dict) else []
+
+
+def _is_stats_list(result: list) -> bool:
+    """True if result is a non-empty list of player stat dicts."""
+    return bool(result) and all(
+        isinstance(d, dict) and ("id" in d or "userName" in d) for d in result
+    )
+
+
+def _retry_after_sec(r: requests.Response | None) -> float | None:
+    """Parse a Retry-After header (seconds or HTTP-date); None if absent/invalid."""
+    if r is None:
+        return None
+    value = r.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
 
 class BF6APIClient:
     def __init__(
@@ -25,23 +200,69 @@ class BF6APIClient:
         base_url: str = BASE_URL,
         rate_limit_sec: float = DEFAULT_RATE_LIMIT_SEC,
         max_retries: int = MAX_RETRIES,
+        cache_path: str | Path | None = None,
     ):
+        """cache_path: SQLite file for cached player IDs; None disables caching."""
         self.base_url = base_url.rstrip("/")
-        self.rate_limit_sec = rate_limit_sec
         self.max_retries = max_retries
-        self._last_request_time: float = 0.0
+        self._id_cache = PlayerIDCache(cache_path) if cache_path else None
+        # Whether /bf6/multiple/ accepts names; None until the first attempt
+        self.batch_names_supported: bool | None = None
+        self._rate_limiter = AdaptiveRateLimiter(rate_limit_sec)
+        # One session for the client's lifetime: keep-alive + connection pooling
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE),
+        )
+
+    @property
+    def rate_limit_sec(self) -> float:
+        """Configured baseline seconds between requests."""
+        return self._rate_limiter.base_interval_sec
+
+    @rate_limit_sec.setter
+    def rate_limit_sec(self, value: float) -> None:
+        self._rate_limiter.set_base_interval(value)
+
+    def close(self) -> None:
+        """Close the underlying HTTP session and its pooled connections."""
+        self._session.close()
+        if self._id_cache is not None:
+            self._id_cache.close()
+
+    def __enter__(self) -> "BF6APIClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def _wait_rate_limit(self) -> None:
-        elapsed = time.monotonic() - self._last_request_time
-        if elapsed < self.rate_limit_sec:
-            time.sleep(self.rate_limit_sec - elapsed)
-        self._last_request_time = time.monotonic()
+        self._rate_limiter.wait()
+
+    def _sleep_or_raise(
+        self,
+        attempt: int,
+        message: str,
+        response: requests.Response | None = None,
+    ) -> None:
+        """
+        On last attempt raise BF6APIError (with the response's status code, if
+        any); otherwise sleep and continue.
 
-    def _sleep_or_raise(self, attempt: int, message: str) -> None:
-        """On last attempt raise BF6APIError; otherwise sleep and continue."""
+        Honors the response's Retry-After header if present, else uses
+        exponential backoff with jitter; both capped at RETRY_BACKOFF_CAP_SEC.
+        """
         if attempt == self.max_retries - 1:
-            raise BF6APIError(message)
-        time.sleep(RETRY_BACKOFF_SEC * (attempt + 1))
+            raise BF6APIError(
+                message,
+                status_code=response.status_code if response is not None else None,
+            )
+        delay = _retry_after_sec(response)
+        if delay is None:
+            delay = RETRY_BACKOFF_SEC * 2**attempt
+            delay += random.uniform(0, RETRY_JITTER_SEC)
+        time.sleep(min(RETRY_BACKOFF_CAP_SEC, delay))
 
     def _request(
         self,
@@ -55,30 +276,46 @@ class BF6APIClient:
             self._wait_rate_limit()
             try:
                 if method.upper() == "GET":
-                    r = requests.get(url, params=params, timeout=30)
+                    r = self._session.get(url, params=params, timeout=30)
                 else:
-                    r = requests.post(url, params=params, json=json, timeout=30)
+                    r = self._session.post(
+                        url, params=params, json=json, timeout=30
+                    )
             except requests.RequestException as e:
                 self._sleep_or_raise(attempt, f"Request failed: {e}")
                 continue
 
+            if r.status_code in THROTTLE_STATUS_CODES:
+                self._rate_limiter.on_throttle()
+
+            if r.status_code == 429:
+                self._sleep_or_raise(
+                    attempt, f"Rate limited (429): {r.text[:200]}", r
+                )
+                continue
+
             if r.status_code >= 500:
                 self._sleep_or_raise(
                     attempt,
                     f"Server error {r.status_code}: {r.text[:200]}",
+                    r,
                 )
                 continue
 
             if r.status_code >= 400:
                 try:
-                    err = r.json()
+                    err = json_compat.loads(r.content)
                     errors = err.get("errors", [r.text[:200]])
                 except Exception:
                     errors = [r.text[:200]]
-                raise BF6APIError(f"API error {r.status_code}: {errors}")
+                raise BF6APIError(
+                    f"API error {r.status_code}: {errors}",
+                    status_code=r.status_code,
+                )
 
+            self._rate_limiter.on_success()
             try:
-                return r.json()
+                return json_compat.loads(r.content)
             except Exception as e:
                 raise BF6APIError(f"Invalid JSON response: {e}") from e
 
@@ -88,15 +325,24 @@ class BF6APIClient:
         """
         Resolve player ID from name and platform.
         Returns dict with at least 'id' and optionally 'userName'.
+        Served from the ID cache when one is configured.
         """
+        if self._id_cache is not None:
+            cached = self._id_cache.get(name, platform)
+            if cached is not None:
+                return cached
         path = "/bf6/player/"
         params = {"name": name, "platform": platform}
         data = self._request("GET", path, params=params)
         if isinstance(data, dict) and "id" in data:
-            return data
-        if isinstance(data, list) and data:
-            return data[0] if isinstance(data[0], dict) else {"id": data[0]}
-        raise BF6APIError(f"Could not resolve player: {name} on {platform}")
+            info = data
+        elif isinstance(data, list) and data:
+            info = data[0] if isinstance(data[0], dict) else {"id": data[0]}
+        else:
+            raise BF6APIError(f"Could not resolve player: {name} on {platform}")
+        if self._id_cache is not None:
+            self._id_cache.put(name, platform, info)
+        return info
 
     def get_stats(
         self,
@@ -118,24 +364,48 @@ class BF6APIClient:
         return self._request("GET", path, params=params)  # type: ignore[return-value]
 
     def get_stats_batch(
-        self, player_ids: list[str | int], platform: str = "pc"
+        self,
+        player_ids: list[str | int] | None = None,
+        platform: str = "pc",
+        *,
+        names: list[str] | None = None,
     ) -> list[dict]:
         """
         Get stats for up to 128 players in one request.
-        player_ids: list of numeric player IDs (as int or string).
+        Provide either player_ids (numeric, as int or string) or names.
+
+        Name lookups skip ID resolution. Until a name batch has succeeded
+        (batch_names_supported is None), a rejection (4xx other than 429) or
+        a response that isn't a list of player stats marks
+        batch_names_supported False so callers can fall back to player_ids.
         """
-        if not player_ids:
+        if (player_ids is None) == (names is None):
+            raise ValueError("Provide either player_ids or names")
+        players = player_ids if player_ids is not None else names
+        if not players:
             return []
-        if len(player_ids) > 128:
+        if len(players) > 128:
             raise ValueError("Maximum 128 players per batch")
         path = "/bf6/multiple/"
-        body = {
-            "playerIds": [str(pid) for pid in player_ids],
-            "platform": platform,
-        }
-        data = self._request("POST", path, json=body)
-        if isinstance(data, list):
-            return data
-        if isinstance(data, dict) and "result" in data:
-            return data["result"]
-        return [data] if isinstance(data, dict) else []
+        body: dict = {"platform": platform}
+        if names is None:
+            body["playerIds"] = [str(pid) for pid in player_ids]
+            return _batch_result(self._request("POST", path, json=body))
+
+        body["names"] = list(names)
+        probing = self.batch_names_supported is None
+        try:
+            data = self._request("POST", path, json=body)
+        except BF6APIError as e:
+            if probing and e.rejected:
+                self.batch_names_supported = False
+            raise
+        result = _batch_result(data)
+        if not _is_stats_list(result):
+            if probing:
+                self.batch_names_supported = False
+            raise BF6APIError(
+                f"Name batch returned no player stats: {str(data)[:200]}"
+            )
+        self.batch_names_supported = True
+        return result
@@ -0,0 +1,35 @@
+"""
+JSON helpers shared by the API client, config loader and storage.
+
+Uses orjson when installed (faster, works in bytes); stdlib json otherwise.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON from bytes or str."""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def dumps_indented(obj: Any) -> bytes:
+    """Encode obj as UTF-8 JSON with 2-space indent (json.dump(indent=2) layout)."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
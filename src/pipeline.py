@@ -1,12 +1,15 @@
 """
-Pipeline: load config -> resolve players -> fetch stats (single or batch).
+Pipeline: load config -> fetch stats (single or batch, resolving IDs if needed).
 
-Returns list of full stat dicts.
+Yields full stat dicts as they arrive.
 """
 
-import json
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 
+from src import json_compat
 from src.api import BF6APIClient, BF6APIError
 
 try:
@@ -15,7 +18,16 @@ try:
 except ImportError:
     HAS_YAML = False
 
+if HAS_YAML:
+    # libyaml C loader when PyYAML was built with it; pure-Python otherwise
+    try:
+        from yaml import CSafeLoader as YAMLLoader
+    except ImportError:
+        from yaml import SafeLoader as YAMLLoader
+
 BATCH_SIZE = 128
+# Concurrent in-flight requests; the client's rate limit still caps request rate
+MAX_WORKERS = 8
 
 
 def load_config(path: str | Path) -> list[dict]:
@@ -35,9 +47,9 @@ def load_config(path: str | Path) -> list[dict]:
             raise ImportError(
                 "PyYAML required for YAML config. pip install pyyaml"
             )
-        data = yaml.safe_load(text)
+        data = yaml.load(text, Loader=YAMLLoader)
     elif suffix == ".json":
-        data = json.loads(text)
+        data = json_compat.loads(text)
     else:
         raise ValueError(f"Unsupported config format: {suffix}. Use .yaml or .json")
     players = data.get("players", data) if isinstance(data, dict) else data
@@ -55,43 +67,110 @@ def load_config(path: str | Path) -> list[dict]:
     return out
 
 
+@contextmanager
+def _thread_pool() -> Iterator[ThreadPoolExecutor]:
+    """
+    ThreadPoolExecutor that drops queued work on exit instead of draining it.
+
+    A plain `with ThreadPoolExecutor()` waits for every queued request on an
+    interrupt or error; here only the requests already in flight finish.
+    """
+    ex = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        yield ex
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _resolve_id(client: BF6APIClient, player: dict) -> str | None:
+    """Resolve one player's numeric ID; None if the API can't find them."""
+    try:
+        info = client.get_player_id(player["name"], player["platform"])
+    except BF6APIError:
+        return None
+    return str(info.get("id", info) if isinstance(info, dict) else info)
+
+
+def _batch_by_ids(
+    client: BF6APIClient, players: list[dict], platform: str
+) -> list[dict]:
+    """Resolve IDs for one batch of players concurrently, then fetch by ID."""
+    with _thread_pool() as ex:
+        ids = list(ex.map(lambda p: _resolve_id(client, p), players))
+    return client.get_stats_batch(
+        [pid for pid in ids if pid is not None], platform=platform
+    )
+
+
+def _batch_stats(client: BF6APIClient, players: list[dict]) -> Iterator[dict]:
+    """
+    Fetch stats in batches of BATCH_SIZE per platform, by name when possible.
+
+    A batch the API rejects with a 4xx resolves player IDs instead. Once the
+    client finds name batches unsupported, all remaining batches do too.
+    """
+    platforms = {p["platform"] for p in players}
+    by_platform: dict[str, list[dict]]
+    if len(platforms) == 1:
+        # Common case: everyone on one platform, skip per-player grouping
+        by_platform = {platforms.pop(): players}
+    else:
+        by_platform = {}
+        for p in players:
+            by_platform.setdefault(p["platform"], []).append(p)
+    for platform, group in by_platform.items():
+        for i in range(0, len(group), BATCH_SIZE):
+            chunk = group[i : i + BATCH_SIZE]
+            if client.batch_names_supported is not False:
+                try:
+                    batch = client.get_stats_batch(
+                        names=[p["name"] for p in chunk], platform=platform
+                    )
+                except BF6APIError as e:
+                    # Fall back to IDs for this chunk on a client error, and
+                    # for every later chunk once names are found unsupported
+                    if not e.rejected and client.batch_names_supported is not False:
+                        raise
+                else:
+                    yield from batch
+                    continue
+            yield from _batch_by_ids(client, chunk, platform)
+
+
 def run_pipeline(
     players: list[dict],
     *,
     use_batch: bool = True,
     rate_limit_sec: float = 1.0,
-) -> list[dict]:
+    cache_path: str | Path | None = None,
+) -> Iterator[dict]:
     """
-    Resolve player IDs, fetch stats (single or batch), return list of stat dicts.
+    Fetch stats (single or batch), yield stat dicts.
+
+    Results are yielded as each request completes so callers can stream them
+    to storage without holding the whole run in memory.
 
     players: list of {"name": "...", "platform": "pc"} dicts.
     use_batch: if True and len(players) > 1, use POST /bf6/multiple/ (up to 128).
+    cache_path: SQLite file caching resolved player IDs across runs.
     """
-    client = BF6APIClient(rate_limit_sec=rate_limit_sec)
-    results: list[dict] = []
-    if use_batch and len(players) > 1:
-        # Resolve all IDs first
-        ids_by_platform: dict[str, list[str]] = {}
-        for p in players:
-            platform = p["platform"]
-            try:
-                info = client.get_player_id(p["name"], platform)
-                pid = str(
-                    info.get("id", info) if isinstance(info, dict) else info
-                )
-                ids_by_platform.setdefault(platform, []).append(pid)
-            except BF6APIError:
-                continue
-        for platform, id_list in ids_by_platform.items():
-            for i in range(0, len(id_list), BATCH_SIZE):
-                chunk = id_list[i : i + BATCH_SIZE]
-                batch = client.get_stats_batch(chunk, platform=platform)
-                results.extend(batch)
-    else:
-        for p in players:
-            try:
-                stats = client.get_stats(name=p["name"], platform=p["platform"])
-                results.append(stats)
-            except BF6APIError:
-                continue
-    return results
+    with BF6APIClient(
+        rate_limit_sec=rate_limit_sec, cache_path=cache_path
+    ) as client:
+        if use_batch and len(players) > 1:
+            yield from _batch_stats(client, players)
+        else:
+            # One request per player; yield in completion order
+            with _thread_pool() as ex:
+                futures = [
+                    ex.submit(
+                        client.get_stats, name=p["name"], platform=p["platform"]
+                    )
+                    for p in players
+                ]
+                for fut in as_completed(futures):
+                    try:
+                        stats = fut.result()
+                    except BF6APIError:
+                        continue
+                    yield stats
@@ -3,11 +3,16 @@ Storage layer: write pipeline results to JSON, CSV, or SQLite.
 """
 
 import csv
-import json
+import os
 import sqlite3
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from itertools import chain
 from pathlib import Path
 
+from src import json_compat
+
 # Keys to include in flattened summary row for CSV / SQLite
 SUMMARY_KEYS = [
     "userName",
@@ -32,9 +37,24 @@ SUMMARY_KEYS = [
     "repairs",
 ]
 
+_SUMMARY_SET = frozenset(SUMMARY_KEYS)
+
+# CSV header: fixed schema, fetched_at first, then SUMMARY_KEYS
+CSV_COLUMNS = ["fetched_at"] + SUMMARY_KEYS
+
 # SQLite table columns: run_id and fetched_at first, then SUMMARY_KEYS
 SQLITE_COLUMNS = ["run_id", "fetched_at"] + SUMMARY_KEYS
 
+# SQL built once from SQLITE_COLUMNS. Schema: all columns as TEXT for
+# simplicity (SQLite is flexible)
+_COL_DEFS = ", ".join(f"{c} TEXT" for c in SQLITE_COLUMNS)
+_PLACEHOLDERS = ", ".join("?" for _ in SQLITE_COLUMNS)
+_CREATE_SQL = f"CREATE TABLE IF NOT EXISTS stats ({_COL_DEFS})"
+_INSERT_SQL = (
+    f"INSERT OR REPLACE INTO stats ({', '.join(SQLITE_COLUMNS)}) "
+    f"VALUES ({_PLACEHOLDERS})"
+)
+
 
 def _stats_filename(run_id: str | None, extension: str) -> str:
     """Return stats filename: stats_{run_id}.{ext} or stats_{timestamp}.{ext}."""
@@ -51,65 +71,118 @@ def _ensure_output_dir(output_dir: Path) -> Path:
     return output_dir
 
 
-def flatten_summary(stats: dict) -> dict:
-    """Extract a flat summary dict from full stats JSON for one player."""
-    out = {
-        "fetched_at": datetime.now(timezone.utc)
-        .isoformat()
-        .replace("+00:00", "Z"),
-    }
-    for key in SUMMARY_KEYS:
-        if key in stats:
-            out[key] = stats[key]
+def peek(results: Iterable[dict]) -> Iterator[dict] | None:
+    """Return an iterator over results, or None if there are none."""
+    it = iter(results)
+    for first in it:
+        return chain([first], it)
+    return None
+
+
+@contextmanager
+def _atomic_open(path: Path, mode: str, **kwargs) -> Iterator:
+    """
+    Open a temp file next to path and move it into place on success.
+
+    Results are streamed while the API is still being called, so a failed
+    request must not leave a truncated output file behind.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def flatten_summary(stats: dict, fetched_at: str) -> dict:
+    """
+    Extract a flat summary dict from full stats JSON for one player.
+
+    fetched_at is passed in so every row saved in one run shares a timestamp.
+    Key order is not preserved; writers order columns themselves.
+    """
+    out = {k: stats[k] for k in _SUMMARY_SET & stats.keys()}
+    out["fetched_at"] = fetched_at
     return out
 
 
-def _all_summary_keys(summaries: list[dict]) -> list[str]:
-    """Collect all keys from summaries (for CSV header), preserving order."""
-    keys = list(summaries[0].keys())
-    for s in summaries[1:]:
-        for k in s:
-            if k not in keys:
-                keys.append(k)
-    return keys
+def _ensure_stats_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Index stats for per-player history lookups and make (run_id, id) unique.
+
+    Databases written before the unique index existed may hold duplicate rows
+    for a player within one run; keep the latest so the index can be built.
+    """
+    has_unique = conn.execute(
+        "SELECT 1 FROM sqlite_master "
+        "WHERE type = 'index' AND name = 'idx_stats_run_player'"
+    ).fetchone()
+    if not has_unique:
+        conn.execute(
+            "DELETE FROM stats WHERE id IS NOT NULL AND rowid NOT IN "
+            "(SELECT MAX(rowid) FROM stats WHERE id IS NOT NULL "
+            "GROUP BY run_id, id)"
+        )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_stats_run_player "
+        "ON stats(run_id, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stats_id_time "
+        "ON stats(id, fetched_at DESC)"
+    )
 
 
 def save_json(
-    results: list[dict], output_dir: Path, run_id: str | None = None
+    results: Iterable[dict], output_dir: Path, run_id: str | None = None
 ) -> Path:
     """
-    Write one JSON file per run.
+    Write one JSON file per run, streaming one player at a time.
 
     Filename: stats_YYYYMMDD_HHMMSS.json or stats_{run_id}.json.
     """
     out_dir = _ensure_output_dir(output_dir)
     path = out_dir / _stats_filename(run_id, "json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    with _atomic_open(path, "wb") as f:
+        # Same layout as json.dump(results, indent=2), one item at a time.
+        # Encoded JSON has no raw newlines inside strings, so re-indenting
+        # each item by replacing b"\n" is safe.
+        f.write(b"[")
+        sep = b"\n  "
+        for stat in results:
+            f.write(sep + json_compat.dumps_indented(stat).replace(b"\n", b"\n  "))
+            sep = b",\n  "
+        f.write(b"]" if sep == b"\n  " else b"\n]")
     return path
 
 
 def save_csv(
-    results: list[dict], output_dir: Path, run_id: str | None = None
+    results: Iterable[dict], output_dir: Path, run_id: str | None = None
 ) -> Path:
     """
     Write one CSV file: one row per player (flattened summary), with timestamp.
+
+    Columns are fixed to CSV_COLUMNS; stat keys outside SUMMARY_KEYS are dropped.
     """
-    if not results:
+    rows = peek(results)
+    if rows is None:
         raise ValueError("No results to write to CSV")
-    summaries = [flatten_summary(r) for r in results]
     out_dir = _ensure_output_dir(output_dir)
     path = out_dir / _stats_filename(run_id, "csv")
-    fieldnames = _all_summary_keys(summaries)
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+    fetched_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    with _atomic_open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
         writer.writeheader()
-        writer.writerows(summaries)
+        for stat in rows:
+            writer.writerow(flatten_summary(stat, fetched_at))
     return path
 
 
 def save_sqlite(
-    results: list[dict],
+    results: Iterable[dict],
     output_dir: Path,
     db_name: str = "bf6_stats.db",
     run_id: str | None = None,
@@ -117,9 +190,11 @@ def save_sqlite(
     """
     Append flattened summary rows to SQLite.
 
-    Table: stats (run_id, fetched_at, ...SUMMARY_KEYS).
+    Table: stats (run_id, fetched_at, ...SUMMARY_KEYS), unique on (run_id, id):
+    re-saving a player under the same run_id replaces the earlier row.
     """
-    if not results:
+    stats = peek(results)
+    if stats is None:
         return Path(output_dir) / db_name
     out_dir = _ensure_output_dir(output_dir)
     db_path = out_dir / db_name
@@ -127,26 +202,21 @@ def save_sqlite(
     fetched_at = now.isoformat().replace("+00:00", "Z")
     rid = run_id or now.strftime("%Y%m%d_%H%M%S")
 
-    # Schema: all columns as TEXT for simplicity (SQLite is flexible)
-    col_defs = ", ".join(f"{c} TEXT" for c in SQLITE_COLUMNS)
-    placeholders = ", ".join(f":{c}" for c in SQLITE_COLUMNS)
-    insert_sql = (
-        f"INSERT INTO stats ({', '.join(SQLITE_COLUMNS)}) "
-        f"VALUES ({placeholders})"
-    )
-
     conn = sqlite3.connect(db_path)
     try:
         cur = conn.cursor()
-        cur.execute(
-            f"CREATE TABLE IF NOT EXISTS stats ({col_defs})"
+        cur.execute(_CREATE_SQL)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _ensure_stats_indexes(conn)
+        # One executemany over a generator: single transaction, no row buffering
+        rows = (
+            {**flatten_summary(s, fetched_at), "run_id": rid}
+            for s in stats
+        )
+        cur.executemany(
+            _INSERT_SQL, (tuple(r.get(c) for c in SQLITE_COLUMNS) for r in rows)
         )
-        for stat in results:
-            summary = flatten_summary(stat)
-            summary["run_id"] = rid
-            summary["fetched_at"] = fetched_at
-            row = {c: summary.get(c) for c in SQLITE_COLUMNS}
-            cur.execute(insert_sql, row)
         conn.commit()
     finally:
         conn.close()